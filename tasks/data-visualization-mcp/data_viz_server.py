@@ -11,8 +11,9 @@ Based on the implementation roadmap from the MCP documentation.
 
 import os
 import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 
 import pandas as pd
 import matplotlib.pyplot as plt
@@ -35,6 +36,93 @@ OUTPUT_DIR = Path(os.environ.get("OUTPUT_DIR", "/Users/mad265/git-pub/dissc-agen
 # Ensure output directory exists
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
+# Memory budget (in MB) shared by all concurrently running chunks of bootstrap resamples
+BOOTSTRAP_MEMORY_BUDGET_MB = float(os.environ.get("BOOTSTRAP_MEMORY_BUDGET_MB", "64"))
+
+# Replicates drawn from each child seed; fixed so the CI does not depend on chunking
+BOOTSTRAP_BLOCK_SIZE = 32
+
+# Upper bound on bootstrap replicates accepted from a single tool call
+MAX_BOOTSTRAP_REPLICATES = 100_000
+
+
+def _bootstrap_chunk(x: np.ndarray, y: np.ndarray,
+                     blocks: List[Tuple[int, np.random.SeedSequence]]) -> np.ndarray:
+    """Computes correlation and slope for a batch of seeded bootstrap blocks. Returns an array of shape (2, n_replicates)."""
+    n = len(x)
+    
+    # Each row of the index matrix is one resample of the original observations
+    idx = np.vstack([np.random.default_rng(seed_seq).integers(0, n, size=(size, n))
+                     for size, seed_seq in blocks])
+    x_dev = x[idx]
+    x_dev -= x_dev.mean(axis=1, keepdims=True)
+    y_dev = y[idx]
+    y_dev -= y_dev.mean(axis=1, keepdims=True)
+    del idx
+    
+    sxy = np.einsum('ij,ij->i', x_dev, y_dev)
+    sxx = np.einsum('ij,ij->i', x_dev, x_dev)
+    syy = np.einsum('ij,ij->i', y_dev, y_dev)
+    
+    # Degenerate resamples (all identical values) produce NaN and are dropped later
+    with np.errstate(divide='ignore', invalid='ignore'):
+        correlation = sxy / np.sqrt(sxx * syy)
+        slope = sxy / sxx
+    
+    return np.vstack([correlation, slope])
+
+
+def _bootstrap_correlation_ci(x: np.ndarray, y: np.ndarray, n_bootstrap: int = 2000,
+                              confidence_level: float = 0.95, seed: int = 42,
+                              n_jobs: int = 1) -> Dict[str, Any]:
+    """Computes percentile bootstrap confidence intervals for the Pearson correlation and regression slope.
+    
+    Replicates are drawn in blocks of BOOTSTRAP_BLOCK_SIZE, each with its own child seed, so results are
+    reproducible for a given seed regardless of n_jobs or the memory budget. Blocks are grouped into chunks
+    so that all concurrently running chunks fit in BOOTSTRAP_MEMORY_BUDGET_MB (at least one block per chunk).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+    
+    block_sizes = [min(BOOTSTRAP_BLOCK_SIZE, n_bootstrap - start)
+                   for start in range(0, n_bootstrap, BOOTSTRAP_BLOCK_SIZE)]
+    blocks = list(zip(block_sizes, np.random.SeedSequence(seed).spawn(len(block_sizes))))
+    
+    # Per replicate: one int64 index row plus two float64 resampled rows
+    bytes_per_replicate = 3 * 8 * n
+    budget_per_worker = BOOTSTRAP_MEMORY_BUDGET_MB * 1024 * 1024 / n_jobs
+    blocks_per_chunk = max(1, int(budget_per_worker // (bytes_per_replicate * BOOTSTRAP_BLOCK_SIZE)))
+    chunks = [blocks[i:i + blocks_per_chunk] for i in range(0, len(blocks), blocks_per_chunk)]
+    
+    # NumPy releases the GIL in the heavy kernels, so threads parallelize well here
+    if n_jobs > 1 and len(chunks) > 1:
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            results = list(executor.map(lambda chunk: _bootstrap_chunk(x, y, chunk), chunks))
+    else:
+        results = [_bootstrap_chunk(x, y, chunk) for chunk in chunks]
+    
+    replicates = np.hstack(results)
+    
+    # Use the same replicates for both statistics, dropping any that are degenerate in either
+    valid = np.isfinite(replicates[0]) & np.isfinite(replicates[1])
+    n_valid = int(valid.sum())
+    if n_valid == 0:
+        return {"correlation_ci": (np.nan, np.nan), "slope_ci": (np.nan, np.nan), "n_valid": 0}
+    
+    alpha = (1 - confidence_level) / 2
+    correlation_ci = np.quantile(replicates[0, valid], [alpha, 1 - alpha])
+    slope_ci = np.quantile(replicates[1, valid], [alpha, 1 - alpha])
+    
+    return {
+        "correlation_ci": (float(correlation_ci[0]), float(correlation_ci[1])),
+        "slope_ci": (float(slope_ci[0]), float(slope_ci[1])),
+        "n_valid": n_valid,
+    }
+
 
 @mcp.tool()
 def list_data_files() -> str:
@@ -112,9 +200,23 @@ def describe_dataset(filename: str) -> str:
 
 
 @mcp.tool()
-def generate_correlation_plot(filename: str, plot_type: str = "scatter") -> str:
-    """Creates a scatter plot or heatmap showing the correlation between obesity and diabetes prevalence by state. Returns a base64 encoded image."""
+def generate_correlation_plot(filename: str, plot_type: str = "scatter",
+                              confidence_interval: bool = False, n_bootstrap: int = 2000,
+                              confidence_level: float = 0.95, seed: int = 42,
+                              n_jobs: int = 1) -> str:
+    """Creates a scatter plot or heatmap showing the correlation between obesity and diabetes prevalence by state. Optionally computes bootstrap confidence intervals for the correlation and regression slope (n_jobs=-1 uses all cores)."""
     try:
+        if plot_type not in ("scatter", "heatmap"):
+            return f"Error: Invalid plot type '{plot_type}'. Use 'scatter' or 'heatmap'."
+        
+        if confidence_interval:
+            if not 1 <= n_bootstrap <= MAX_BOOTSTRAP_REPLICATES:
+                return f"Error: n_bootstrap must be between 1 and {MAX_BOOTSTRAP_REPLICATES}."
+            if not 0 < confidence_level < 1:
+                return "Error: confidence_level must be between 0 and 1."
+            if n_jobs != -1 and n_jobs < 1:
+                return "Error: n_jobs must be -1 (all cores) or a positive integer."
+        
         file_path = DATA_DIR / filename
         
         if not file_path.exists():
@@ -133,6 +235,22 @@ def generate_correlation_plot(filename: str, plot_type: str = "scatter") -> str:
         if len(df_clean) == 0:
             return "Error: No valid data points found for correlation analysis."
         
+        ci_summary = ""
+        if confidence_interval:
+            if len(df_clean) < 3:
+                return "Error: At least 3 data points are required for bootstrap confidence intervals."
+            ci = _bootstrap_correlation_ci(df_clean['Obesity'].to_numpy(), df_clean['Diabetes'].to_numpy(),
+                                           n_bootstrap=n_bootstrap, confidence_level=confidence_level,
+                                           seed=seed, n_jobs=n_jobs)
+            if ci['n_valid'] == 0:
+                return "Error: All bootstrap resamples were degenerate (constant values); cannot compute confidence intervals."
+            level_pct = f"{confidence_level * 100:g}%"
+            ci_summary = (
+                f"\n\nBootstrap {level_pct} CI ({ci['n_valid']} valid of {n_bootstrap} replicates, seed={seed}):\n"
+                f"  - Correlation: [{ci['correlation_ci'][0]:.3f}, {ci['correlation_ci'][1]:.3f}]\n"
+                f"  - Slope: [{ci['slope_ci'][0]:.3f}, {ci['slope_ci'][1]:.3f}]"
+            )
+        
         # Create the plot
         plt.figure(figsize=(10, 6))
         
@@ -144,7 +262,11 @@ def generate_correlation_plot(filename: str, plot_type: str = "scatter") -> str:
             
             # Add correlation coefficient
             correlation = df_clean['Obesity'].corr(df_clean['Diabetes'])
-            plt.text(0.05, 0.95, f'Correlation: {correlation:.3f}', 
+            annotation = f'Correlation: {correlation:.3f}'
+            if confidence_interval:
+                annotation += (f"\n{level_pct} CI: [{ci['correlation_ci'][0]:.3f}, {ci['correlation_ci'][1]:.3f}]"
+                               f"\nSlope {level_pct} CI: [{ci['slope_ci'][0]:.3f}, {ci['slope_ci'][1]:.3f}]")
+            plt.text(0.05, 0.95, annotation, va='top', 
                     transform=plt.gca().transAxes, 
                     bbox=dict(boxstyle="round,pad=0.3", facecolor="white", alpha=0.8))
             
@@ -159,8 +281,11 @@ def generate_correlation_plot(filename: str, plot_type: str = "scatter") -> str:
             sns.heatmap(corr_data, annot=True, cmap='coolwarm', center=0,
                        square=True, cbar_kws={'shrink': 0.8})
             plt.title('Correlation Heatmap: Obesity vs Diabetes')
-        else:
-            return f"Error: Invalid plot type '{plot_type}'. Use 'scatter' or 'heatmap'."
+            if confidence_interval:
+                plt.figtext(0.5, -0.02,
+                            f"Bootstrap {level_pct} CI: correlation [{ci['correlation_ci'][0]:.3f}, {ci['correlation_ci'][1]:.3f}], "
+                            f"slope [{ci['slope_ci'][0]:.3f}, {ci['slope_ci'][1]:.3f}]",
+                            ha='center', fontsize=9)
         
         plt.tight_layout()
         
@@ -170,7 +295,7 @@ def generate_correlation_plot(filename: str, plot_type: str = "scatter") -> str:
         plt.savefig(output_path, format='png', dpi=150, bbox_inches='tight')
         plt.close()
         
-        return f"Generated {plot_type} plot for {filename}. Image saved to: {output_path}"
+        return f"Generated {plot_type} plot for {filename}. Image saved to: {output_path}{ci_summary}"
         
     except Exception as e:
         return f"Error generating correlation plot: {str(e)}"
@@ -4,13 +4,18 @@ Test script for the Data Visualization MCP Server
 """
 
 import sys
+import tempfile
 from pathlib import Path
 
+import numpy as np
+
 # Add the current directory to Python path
 sys.path.insert(0, str(Path(__file__).parent))
 
 # Import the functions directly
+import data_viz_server
 from data_viz_server import list_data_files, describe_dataset, generate_correlation_plot, generate_state_comparison
+from data_viz_server import _bootstrap_correlation_ci
 
 
 def test_server():
@@ -37,8 +42,21 @@ def test_server():
     if "data:image/png;base64," in result:
         print("Image generated successfully!")
     
+    # Test generate_correlation_plot with bootstrap confidence intervals
+    print("\n4. Testing generate_correlation_plot with confidence intervals...")
+    result = generate_correlation_plot(
+        "obesity-vs-diabetes-prevalencebystate_wide.csv",
+        "scatter",
+        confidence_interval=True,
+        n_bootstrap=5000,
+        seed=123
+    )
+    print("Result:", result)
+    if "Bootstrap" in result:
+        print("Confidence intervals computed successfully!")
+    
     # Test generate_state_comparison
-    print("\n4. Testing generate_state_comparison...")
+    print("\n5. Testing generate_state_comparison...")
     result = generate_state_comparison(
         "obesity-vs.-diabetes-prevalence-in-lessspan-data-type_location_greaterunited-stateslessspangreater",
         "obesity",
@@ -51,5 +69,66 @@ def test_server():
     print("\n✅ All tests completed successfully!")
 
 
+def test_bootstrap_ci():
+    """Test bootstrap confidence intervals: reproducibility, validation and degenerate data."""
+    print("Testing bootstrap confidence intervals...")
+    
+    rng = np.random.default_rng(0)
+    x = rng.normal(30, 5, size=50)
+    y = 0.2 * x + rng.normal(0, 1, size=50)
+    
+    # Same seed must give the same CI regardless of n_jobs and memory budget
+    print("\n1. Testing reproducibility across n_jobs and memory budget...")
+    baseline = _bootstrap_correlation_ci(x, y, n_bootstrap=2000, seed=42, n_jobs=1)
+    parallel = _bootstrap_correlation_ci(x, y, n_bootstrap=2000, seed=42, n_jobs=4)
+    original_budget = data_viz_server.BOOTSTRAP_MEMORY_BUDGET_MB
+    try:
+        data_viz_server.BOOTSTRAP_MEMORY_BUDGET_MB = 0.01
+        small_budget = _bootstrap_correlation_ci(x, y, n_bootstrap=2000, seed=42, n_jobs=4)
+    finally:
+        data_viz_server.BOOTSTRAP_MEMORY_BUDGET_MB = original_budget
+    print("Result:", baseline)
+    assert baseline == parallel == small_budget
+    assert baseline["correlation_ci"][0] < np.corrcoef(x, y)[0, 1] < baseline["correlation_ci"][1]
+    
+    # Both intervals must be built from the same valid replicates
+    print("\n2. Testing partially degenerate resamples...")
+    result = _bootstrap_correlation_ci(np.array([1.0, 2.0, 3.0, 4.0]), np.array([5.0, 5.0, 5.0, 6.0]),
+                                       n_bootstrap=2000, seed=42)
+    print("Result:", result)
+    assert 0 < result["n_valid"] < 2000
+    assert result["slope_ci"][0] > 0
+    
+    # Invalid arguments are rejected before any data is loaded
+    print("\n3. Testing argument validation...")
+    for kwargs, message in [
+        ({"plot_type": "bogus"}, "Invalid plot type"),
+        ({"n_bootstrap": 0}, "n_bootstrap"),
+        ({"n_bootstrap": data_viz_server.MAX_BOOTSTRAP_REPLICATES + 1}, "n_bootstrap"),
+        ({"confidence_level": 1.0}, "confidence_level"),
+        ({"n_jobs": 0}, "n_jobs"),
+        ({"n_jobs": -2}, "n_jobs"),
+    ]:
+        result = generate_correlation_plot("missing.csv", **{"confidence_interval": True, **kwargs})
+        print("Result:", result)
+        assert result.startswith("Error:") and message in result
+    
+    # Constant data makes every resample degenerate
+    print("\n4. Testing all-degenerate data...")
+    original_data_dir = data_viz_server.DATA_DIR
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        (Path(tmp_dir) / "constant.csv").write_text("Obesity,Diabetes\n30,8\n30,9\n30,10\n30,11\n")
+        try:
+            data_viz_server.DATA_DIR = Path(tmp_dir)
+            result = generate_correlation_plot("constant.csv", confidence_interval=True, n_bootstrap=100)
+        finally:
+            data_viz_server.DATA_DIR = original_data_dir
+    print("Result:", result)
+    assert result.startswith("Error:") and "degenerate" in result
+    
+    print("\n✅ Bootstrap tests completed successfully!")
+
+
 if __name__ == "__main__":
-    test_server()
\ No newline at end of file
+    test_server()
+    test_bootstrap_ci()
\ No newline at end of file